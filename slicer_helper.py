@@ -35,12 +35,18 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import slicer
 import vtk
 import time
+from functools import reduce
 import numpy as np
+from vtk import vtkMatrix4x4, vtkMatrix3x3
 
 """The following block of functions are from slicer.util, but are not included in the current 4.10 code base. 
 They are quite helpful so I am housing them here until they are returned to the main code
 https://github.com/Slicer/Slicer/blob/467c4318a114a9165826ab738e7c34a4753327e0/Base/Python/slicer/util.py#L1399"""
 
+# Scratch matrix reused by the transform helpers so that streaming pose updates do not construct a new VTK object on
+# every call. Safe because Slicer copies the values in SetMatrixTransformToParent (Slicer scripting is single-threaded)
+_SCRATCH_VMAT4 = vtkMatrix4x4()
+
 
 def arrayFromVTKMatrix(vmatrix):
     """Return vtkMatrix4x4 or vtkMatrix3x3 elements as numpy array.
@@ -48,18 +54,14 @@ def arrayFromVTKMatrix(vmatrix):
   To set VTK matrix from a numpy array, use :py:meth:`vtkMatrixFromArray` or
   :py:meth:`updateVTKMatrixFromArray`.
   """
-    from vtk import vtkMatrix4x4
-    from vtk import vtkMatrix3x3
-    import numpy as np
     if isinstance(vmatrix, vtkMatrix4x4):
         matrixSize = 4
     elif isinstance(vmatrix, vtkMatrix3x3):
         matrixSize = 3
     else:
         raise RuntimeError("Input must be vtk.vtkMatrix3x3 or vtk.vtkMatrix4x4")
-    narray = np.eye(matrixSize)
-    vmatrix.DeepCopy(narray.ravel(), vmatrix)
-    return narray
+    # GetData() hands back all elements of the contiguous row-major buffer in one call
+    return np.array(vmatrix.GetData(), dtype=np.float64).reshape(matrixSize, matrixSize)
 
 
 def vtkMatrixFromArray(narray):
@@ -68,8 +70,6 @@ def vtkMatrixFromArray(narray):
   The returned matrix is just a copy and so any modification in the array will not affect the output matrix.
   To set numpy array from VTK matrix, use :py:meth:`arrayFromVTKMatrix`.
   """
-    from vtk import vtkMatrix4x4
-    from vtk import vtkMatrix3x3
     narrayshape = narray.shape
     if narrayshape == (4, 4):
         vmatrix = vtkMatrix4x4()
@@ -86,11 +86,9 @@ def vtkMatrixFromArray(narray):
 def updateVTKMatrixFromArray(vmatrix, narray):
     """Update VTK matrix values from a numpy array.
   :param vmatrix: VTK matrix (vtkMatrix4x4 or vtkMatrix3x3) that will be update
-  :param narray: input numpy array
+  :param narray: input numpy array, preferably C-contiguous (other layouts are copied once before the update)
   To set numpy array from VTK matrix, use :py:meth:`arrayFromVTKMatrix`.
   """
-    from vtk import vtkMatrix4x4
-    from vtk import vtkMatrix3x3
     if isinstance(vmatrix, vtkMatrix4x4):
         matrixSize = 4
     elif isinstance(vmatrix, vtkMatrix3x3):
@@ -102,23 +100,28 @@ def updateVTKMatrixFromArray(vmatrix, narray):
     vmatrix.DeepCopy(narray.ravel())
 
 
-def arrayFromTransformMatrix(transformNode, toWorld=False):
+def arrayFromTransformMatrix(transformNode, toWorld=False, out=None, _scratch_vmat=_SCRATCH_VMAT4):
     """Return 4x4 transformation matrix as numpy array.
   :param toWorld: if set to True then the transform to world coordinate system is returned
     (effect of parent transform to the node is applied), otherwise transform to parent transform is returned.
+  :param out: optional preallocated C-contiguous float64 4x4 array that is filled and returned, so that high-rate
+    callers do not allocate a new array on every read.
   The returned array is just a copy and so any modification in the array will not affect the transform node.
   To set transformation matrix from a numpy array, use :py:meth:`updateTransformMatrixFromArray`.
   """
-    import numpy as np
-    from vtk import vtkMatrix4x4
-    vmatrix = vtkMatrix4x4()
+    if out is None:
+        out = np.empty((4, 4), dtype=np.float64)
+    elif out.shape != (4, 4) or out.dtype != np.float64 or not out.flags['C_CONTIGUOUS']:
+        raise RuntimeError("out must be a C-contiguous float64 array of shape (4, 4)")
+    vmatrix = _scratch_vmat
     if toWorld:
         success = transformNode.GetMatrixTransformToWorld(vmatrix)
     else:
         success = transformNode.GetMatrixTransformToParent(vmatrix)
     if not success:
         raise RuntimeError("Failed to get transformation matrix from node " + transformNode.GetID())
-    return arrayFromVTKMatrix(vmatrix)
+    out.ravel()[:] = vmatrix.GetData()  # out is contiguous, so ravel() is a view
+    return out
 
 
 def updateTransformMatrixFromArray(transformNode, narray, toWorld=False):
@@ -127,8 +130,6 @@ def updateTransformMatrixFromArray(transformNode, narray, toWorld=False):
     to world matrix will be equal to narray; otherwise transform to parent will be
     set as narray.
   """
-    import numpy as np
-    from vtk import vtkMatrix4x4
     narrayshape = narray.shape
     if narrayshape != (4, 4):
         raise RuntimeError("Unsupported numpy array shape: " + str(narrayshape) + " expected (4,4)")
@@ -138,7 +139,11 @@ def updateTransformMatrixFromArray(transformNode, narray, toWorld=False):
         thisToParent = np.dot(np.linalg.inv(narrayParentToWorld), narray)
         updateTransformMatrixFromArray(transformNode, thisToParent, toWorld=False)
     else:
-        vmatrix = vtkMatrix4x4()
+        vmatrix = _SCRATCH_VMAT4
+        # Skip repeated poses (e.g. a still tool on a stream) so no Modified() cascade reaches observers and renderers
+        if (transformNode.GetMatrixTransformToParent(vmatrix)
+                and np.abs(arrayFromVTKMatrix(vmatrix) - narray).max() <= 1e-9):
+            return
         updateVTKMatrixFromArray(vmatrix, narray)
         transformNode.SetMatrixTransformToParent(vmatrix)
 
@@ -146,6 +151,38 @@ def updateTransformMatrixFromArray(transformNode, narray, toWorld=False):
 """My custom code below"""
 
 
+def arrayFromTransformMatrices(nodes, out=None, toWorld=False):
+    """ Reads the 4x4 matrices of several transform nodes into one C-contiguous (N,4,4) array, e.g. for the poses
+    streamed over IGTL on every tick. A single scratch vtkMatrix4x4 is reused for all nodes
+    INPUT: nodes   [list]       - vtkMRMLTransformNode objects to read
+           out     [np.ndarray] - (optional) preallocated C-contiguous float64 array of shape (N,4,4) to fill
+           toWorld [bool]       - if True read the transform to world, otherwise the transform to parent
+    OUPUT: out [np.ndarray] - (N,4,4) array, out[i] is the matrix of nodes[i] """
+    if out is None:
+        out = np.empty((len(nodes), 4, 4), dtype=np.float64)
+    elif out.shape != (len(nodes), 4, 4) or out.dtype != np.float64 or not out.flags['C_CONTIGUOUS']:
+        raise RuntimeError("out must be a C-contiguous float64 array of shape " + str((len(nodes), 4, 4)))
+    for i, node in enumerate(nodes):
+        arrayFromTransformMatrix(node, toWorld=toWorld, out=out[i])
+    return out
+
+
+def composeTransformChain(node):
+    """ Composes the to-parent matrices of a transform node and all of its ancestors (e.g. tool -> ref -> world).
+    The chain is read into one contiguous (N,4,4) array and multiplied together with np.matmul
+    INPUT: node [vtkMRMLTransformNode] - transform node at the bottom of the chain
+    OUPUT: toWorld [np.ndarray] - 4x4 matrix from node coordinates to world coordinates """
+    if not node:
+        raise RuntimeError("Input must be a transform node, got " + str(node))
+    chain = []
+    while node:
+        chain.append(node)
+        node = node.GetParentTransformNode()
+    stack = arrayFromTransformMatrices(chain)
+    # world <- ... <- parent <- node, so the root's matrix is the leftmost factor
+    return reduce(np.matmul, stack[::-1])
+
+
 def make_igtl_node(ip, port, name):
     """ Creates an IGT_link node in Slicer that can be used to communicate with e.g. ROS
     INPUT: ip   [str]  - IP address, (accepts 'localhost')
@@ -170,13 +207,33 @@ class SlicerMeshModel:
         self.transform_name = transform_name
         self.mesh_filename = mesh_filename
         _, self.mesh_model_node = slicer.util.loadModel(mesh_filename, returnNode=True)  # TODO: [May become deprecated]
-        self.mesh_nodeID = self.mesh_model_node.GetID()
         self.transform_node = slicer.vtkMRMLTransformNode()
         self.transform_node.SetName(transform_name)
         slicer.mrmlScene.AddNode(self.transform_node)
-        self.transform_nodeID = self.transform_node.GetID()
         self.display_node = self.mesh_model_node.GetDisplayNode()
-        self.mesh_model_node.SetAndObserveTransformNodeID(self.transform_nodeID)
+        self.mesh_model_node.SetAndObserveTransformNodeID(self.transform_node.GetID())
+
+    @classmethod
+    def bulk_load(cls, pairs):
+        """ Creates many mesh models inside a single scene batch. This replaces the separate rounds of observer
+        notifications of N individual loads with one full refresh of the observers when the batch ends
+        INPUT: pairs [list] - (transform_name, mesh_filename) tuples, as passed to the constructor
+        OUPUT: mesh_models [list of SlicerMeshModel] """
+        slicer.mrmlScene.StartState(slicer.vtkMRMLScene.BatchProcessState)
+        try:
+            return [cls(transform_name, mesh_filename) for transform_name, mesh_filename in pairs]
+        finally:
+            slicer.mrmlScene.EndState(slicer.vtkMRMLScene.BatchProcessState)
+
+    @property
+    def mesh_nodeID(self):
+        """ Scene ID of the mesh model node, looked up on access rather than at construction """
+        return self.mesh_model_node.GetID()
+
+    @property
+    def transform_nodeID(self):
+        """ Scene ID of the transform node, looked up on access rather than at construction """
+        return self.transform_node.GetID()
 
 
 class SlicerVolumeModel:
@@ -194,7 +251,7 @@ class SlicerVolumeModel:
         self.displayNode.UnRegister(slicer_logic)
         slicer_logic.UpdateDisplayNodeFromVolumeNode(self.displayNode, self.label_volumeNode)
         self.label_volumeNode.AddAndObserveDisplayNodeID(self.displayNode.GetID())
-        self.voxel_array = slicer.util.arrayFromVolume(self.label_volumeNode)
+        self.voxel_array = slicer.util.arrayFromVolume(self.label_volumeNode)  # already a C-contiguous view (KJI order)
 
     def register_visual_change(self):
         """ Method to call after changing self.voxel_array so that the visualizations update """